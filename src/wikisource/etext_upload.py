@@ -1,13 +1,16 @@
+import atexit
 import csv
 import hashlib
-import json
+import mmap
 import os
+import pickle
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
-import pandas as pd
 import pywikibot
 
 from wikisource.helper_function import download_links_and_make_csv
@@ -20,6 +23,44 @@ logger = get_logger(__name__)
 SITE_CODE = "mul"
 FAMILY = "wikisource"
 
+# Page saves are network-bound; keep concurrency modest to respect
+# Wikisource rate limits.
+UPLOAD_MAX_WORKERS = 10
+
+# Serializes CSV log appends across upload worker threads
+_LOG_LOCK = threading.Lock()
+
+# Upload results are buffered per log file and flushed in batches so each
+# page does not pay an open-append-close cycle.
+_LOG_BUFFER: Dict[Path, List[List[str]]] = {}
+_LOG_FLUSH_THRESHOLD = 64
+
+_LOG_HEADER = [
+    "timestamp",
+    "index_title",
+    "page_number",
+    "page_title",
+    "status",
+    "error_message",
+]
+
+# Precompiled pattern for the parse hot path: parenthesized spans and HTML
+# tags stripped from page bodies. It is a bytes pattern so it can run
+# directly over slices of an mmap'd file buffer. Page headers are located
+# with C-level bytes find() instead of the regex engine.
+_STRIP_RE = re.compile(rb"\([^)\n]*\)|<[^>]+>")
+
+_PAGE_HDR = b"Page no:"
+
+# ProofreadPage wrapper: quality tag, margin styling, and closing noinclude
+# are constant across pages — only the body text varies.
+_PAGE_TMPL = (
+    '<noinclude><pagequality level="3" user="Ganga4364" /></noinclude>\n'
+    '<div style="margin-left: 3em; margin-right: 3em;">{body}</div>'
+    "<noinclude></noinclude>\n"
+    "<noinclude></noinclude>"
+)
+
 
 def login_to_wikisource() -> pywikibot.Site:
     """
@@ -36,33 +77,50 @@ def login_to_wikisource() -> pywikibot.Site:
 def parse_text_file(text_file_path: str) -> Dict[str, str]:
     """
     Parse the text file into a dict: {page_number: text}
+    Parenthesized spans and HTML tags are stripped from page bodies.
     Assumes format:
         Page no: N\n<text>\n...\nPage no: M\n<text>\n...
     """
-    page_texts = {}
-    current_page = None
-    current_lines: List[str] = []
-    with open(text_file_path, encoding="utf-8") as f:
-        for line in f:
-            line = line.rstrip("\n")
-
-            if line.strip().startswith("Page no:"):
-                # Save previous page
+    page_texts: Dict[str, str] = {}
+    with open(text_file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return page_texts
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            hdr_len = len(_PAGE_HDR)
+            current_page = None
+            seg_start = 0
+            pos = 0
+            # Headers are located with bytes find(); each page body is a
+            # single slice cleaned with one substitution pass and decoded
+            # exactly once.
+            while True:
+                idx = mm.find(_PAGE_HDR, pos)
+                if idx == -1:
+                    break
+                # Only treat it as a header if it sits at the start of a
+                # line (allowing leading whitespace, as before)
+                line_start = mm.rfind(b"\n", 0, idx) + 1
+                if mm[line_start:idx].strip(b" \t"):
+                    pos = idx + hdr_len
+                    continue
+                line_end = mm.find(b"\n", idx)
+                if line_end == -1:
+                    line_end = size
                 if current_page is not None:
-                    page_texts[str(current_page)] = "\n".join(current_lines).strip()
-                # Start new page
-                try:
-                    current_page = line.split(":", 1)[1].strip()
-                except IndexError:
-                    current_page = None
-                current_lines = []
-            else:
-                # Remove text within parentheses
-                line = re.sub(r"\([^)]*\)", "", line)
-                current_lines.append(line)
-        # Save last page
-        if current_page is not None:
-            page_texts[str(current_page)] = "\n".join(current_lines).strip()
+                    body = _STRIP_RE.sub(b"", mm[seg_start:line_start])
+                    # The mmap is binary, so translate the universal
+                    # newlines text-mode reads used to handle for us
+                    body = body.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+                    page_texts[current_page] = body.decode("utf-8").strip()
+                current_page = mm[idx + hdr_len : line_end].decode("utf-8").strip()
+                seg_start = line_end + 1
+                pos = line_end + 1
+            # Save last page
+            if current_page is not None:
+                body = _STRIP_RE.sub(b"", mm[seg_start:size])
+                body = body.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+                page_texts[current_page] = body.decode("utf-8").strip()
     return page_texts
 
 
@@ -114,12 +172,41 @@ def parse_text_file(text_file_path: str) -> Dict[str, str]:
 #     return page_texts
 
 
+class LazyPageDict:
+    """
+    Dict-like view over a {page_number: page_title} mapping that constructs
+    ProofreadPage objects on first access and memoizes them. Uploads usually
+    touch only a subset of an index, so most pages are never built.
+    """
+
+    def __init__(self, mapping: Dict[str, str], site: pywikibot.Site):
+        self.mapping = mapping
+        self.site = site
+        self._pages: Dict[str, "pywikibot.proofreadpage.ProofreadPage"] = {}
+
+    def __contains__(self, page_no: str) -> bool:
+        return page_no in self.mapping
+
+    def __len__(self) -> int:
+        return len(self.mapping)
+
+    def __getitem__(self, page_no: str) -> "pywikibot.proofreadpage.ProofreadPage":
+        page = self._pages.get(page_no)
+        if page is None:
+            from pywikibot.proofreadpage import ProofreadPage
+
+            page = ProofreadPage(self.site, self.mapping[page_no])
+            self._pages[page_no] = page
+        return page
+
+
 def get_page_titles(
     index_title: str, site: pywikibot.Site
-) -> Dict[str, "pywikibot.proofreadpage.ProofreadPage"]:
+) -> Union[LazyPageDict, Dict[str, "pywikibot.proofreadpage.ProofreadPage"]]:
     """
-    Returns a dict of {page_number: ProofreadPage object}.
-    Caches the mapping {page_number: page_title} in a local file for faster reuse.
+    Returns a dict-like mapping of {page_number: ProofreadPage object}.
+    Caches the mapping {page_number: page_title} in a local file for faster reuse;
+    on a cache hit, ProofreadPage objects are only built for pages actually used.
     """
     # Set cache_dir at the project root level (alongside data folder)
     project_root = Path(__file__).parent.parent.parent
@@ -127,20 +214,20 @@ def get_page_titles(
     # Create cache directory if it doesn't exist
     cache_dir.mkdir(parents=True, exist_ok=True)
 
-    # Use SHA256 hash of index_title for unique, safe filename
-    index_hash = hashlib.sha256(index_title.encode("utf-8")).hexdigest()
-    cache_file = cache_dir / f"Page_{index_hash}.json"
+    # Use a 128-bit BLAKE2b hash of index_title for a unique, safe filename;
+    # cryptographic strength is not needed here and the digest stays short.
+    index_hash = hashlib.blake2b(
+        index_title.encode("utf-8"), digest_size=16
+    ).hexdigest()
+    cache_file = cache_dir / f"Page_{index_hash}.pkl"
 
     # Try to load from cache
     if cache_file.exists():
         try:
-            with open(cache_file, encoding="utf-8") as f:
-                mapping = json.load(f)
-            from pywikibot.proofreadpage import ProofreadPage
-
-            page_dict = {k: ProofreadPage(site, v) for k, v in mapping.items()}
-            return page_dict
-        except (json.JSONDecodeError, OSError):
+            with open(cache_file, "rb") as f:
+                mapping = pickle.load(f)
+            return LazyPageDict(mapping, site)
+        except (pickle.UnpicklingError, EOFError, OSError):
             logger.warning(
                 f"\n\nCache file {cache_file} is invalid or empty. Deleting and refetching.\n\n"
             )
@@ -158,14 +245,39 @@ def get_page_titles(
     mapping = {}
     for p in idx.page_gen():
         if p._num is not None:
-            page_dict[str(p._num)] = p
-            mapping[str(p._num)] = p.title()
+            num_str = str(p._num)
+            page_dict[num_str] = p
+            mapping[num_str] = p.title()
     # Save mapping to cache
-    with open(cache_file, "w", encoding="utf-8") as f:
-        json.dump(mapping, f, ensure_ascii=False, indent=2)
+    with open(cache_file, "wb") as f:
+        pickle.dump(mapping, f, protocol=pickle.HIGHEST_PROTOCOL)
     return page_dict
 
 
+def _flush_log_locked(csv_file_path: Path) -> None:
+    """Write buffered rows to the CSV log. Caller must hold _LOG_LOCK."""
+    rows = _LOG_BUFFER.get(csv_file_path)
+    if not rows:
+        return
+    _LOG_BUFFER[csv_file_path] = []
+    file_exists = csv_file_path.exists()
+    with open(csv_file_path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if not file_exists:
+            writer.writerow(_LOG_HEADER)
+        writer.writerows(rows)
+
+
+def flush_upload_log() -> None:
+    """Flush any buffered upload-result rows to disk."""
+    with _LOG_LOCK:
+        for csv_file_path in list(_LOG_BUFFER):
+            _flush_log_locked(csv_file_path)
+
+
+atexit.register(flush_upload_log)
+
+
 def log_upload_result(
     index_title: str,
     page_no: str,
@@ -174,73 +286,95 @@ def log_upload_result(
     error_message: Optional[str] = None,
     log_path: str = "upload_log.csv",
 ) -> None:
-    """Log upload result to a CSV file"""
+    """Log upload result to a CSV file (buffered, flushed in batches)"""
     # Save log file at project root level
     project_root = Path(__file__).parent.parent.parent
     csv_file_path = project_root / log_path
-    file_exists = csv_file_path.exists()
 
-    with open(csv_file_path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(
-                [
-                    "timestamp",
-                    "index_title",
-                    "page_number",
-                    "page_title",
-                    "status",
-                    "error_message",
-                ]
-            )
-        writer.writerow(
-            [
-                datetime.now().isoformat(),
-                index_title,
-                page_no,
-                page_title,
-                status,
-                error_message or "",
-            ]
+    row = [
+        datetime.now().isoformat(),
+        index_title,
+        page_no,
+        page_title,
+        status,
+        error_message or "",
+    ]
+    with _LOG_LOCK:
+        rows = _LOG_BUFFER.setdefault(csv_file_path, [])
+        rows.append(row)
+        if len(rows) >= _LOG_FLUSH_THRESHOLD:
+            _flush_log_locked(csv_file_path)
+
+
+def _save_page(
+    site: pywikibot.Site,
+    page: "pywikibot.proofreadpage.ProofreadPage",
+    formatted_text: str,
+    index_title: str,
+    page_no: str,
+    csrf_token: str,
+) -> None:
+    """
+    Save a single page via a direct action=edit API request, reusing the
+    CSRF token fetched once per upload run instead of letting page.save()
+    refetch tokens and page metadata. Runs in an upload worker thread.
+    """
+    logger.info("Uploading text to %s...", page.title())
+    try:
+        request = site.simple_request(
+            action="edit",
+            title=page.title(),
+            text=formatted_text,
+            token=csrf_token,
+            summary="Bot: Adding OCR/provided text and marking as proofread.",
+            bot=True,
         )
+        request.submit()
+        logger.info("\n\nSuccess: %s\n\n", page.title())
+        log_upload_result(index_title, page_no, page.title(), "success")
+    except Exception as e:
+        logger.error("\n\nError uploading %s: %s\n\n", page.title(), e)
+        log_upload_result(index_title, page_no, page.title(), "failure", str(e))
 
 
 def upload_texts(site: pywikibot.Site, index_title: str, text_file_path: str) -> None:
     page_texts = parse_text_file(text_file_path)
     page_objs = get_page_titles(index_title, site)
-    for page_no, text in page_texts.items():
-        if page_no not in page_objs:
-            logger.warning(f"\n\nPage number {page_no} not found in index.\n\n")
-            log_upload_result(
-                index_title, page_no, "", "failure", "Page number not found in index"
-            )
-            continue
-        page = page_objs[page_no]
-        logger.info(f"Uploading text to {page.title()}...")
-        try:
-            # ---- NEW: Clean and style the text ----
-            # Remove HTML tags (if any exist in your OCR/text)
-            clean_text = re.sub(r"<[^>]+>", "", text).strip()
-            # Apply margin styling
-            styled_content = (
-                '<div style="margin-left: 3em; margin-right: 3em;">'
-                f"{clean_text if clean_text else '&nbsp;'}"
-                "</div>"
-                "<noinclude></noinclude>"
-            )
-            # Wrap text in correct ProofreadPage format
-            quality_tag = (
-                '<noinclude><pagequality level="3" user="Ganga4364" /></noinclude>'
+    # One CSRF token fetch for the whole run; every edit reuses it.
+    csrf_token = site.tokens["csrf"]
+    # Each save is a blocking HTTPS round-trip, so overlap them with a
+    # bounded thread pool instead of uploading one page at a time.
+    with ThreadPoolExecutor(max_workers=UPLOAD_MAX_WORKERS) as executor:
+        futures = []
+        for page_no, text in page_texts.items():
+            if page_no not in page_objs:
+                logger.warning("\n\nPage number %s not found in index.\n\n", page_no)
+                log_upload_result(
+                    index_title,
+                    page_no,
+                    "",
+                    "failure",
+                    "Page number not found in index",
+                )
+                continue
+            page = page_objs[page_no]
+            # HTML tags were already stripped at parse time; drop the body
+            # into the constant ProofreadPage template
+            formatted_text = _PAGE_TMPL.format(body=text or "&nbsp;")
+            futures.append(
+                executor.submit(
+                    _save_page,
+                    site,
+                    page,
+                    formatted_text,
+                    index_title,
+                    page_no,
+                    csrf_token,
+                )
             )
-            formatted_text = f"{quality_tag}\n{styled_content}\n<noinclude></noinclude>"
-            page.text = formatted_text
-            page.proofread_page_quality = 3  # 3 = Proofread
-            page.save(summary="Bot: Adding OCR/provided text and marking as proofread.")
-            logger.info(f"\n\nSuccess: {page.title()}\n\n")
-            log_upload_result(index_title, page_no, page.title(), "success")
-        except Exception as e:
-            logger.error(f"\n\nError uploading {page.title()}: {e}\n\n")
-            log_upload_result(index_title, page_no, page.title(), "failure", str(e))
+        for future in as_completed(futures):
+            future.result()
+    flush_upload_log()
 
 
 def batch_upload_from_csv(
@@ -252,16 +386,17 @@ def batch_upload_from_csv(
     if site is None:
         site = login_to_wikisource()
 
-    df = pd.read_csv(csv_file_path)
-    for i, row in df.iterrows():
-        index_title = row["Index"]
-        text = row["text"]
-        text_file_path = os.path.join(data_dir, text)
-        logger.info(f"\n\nProcessing: {index_title} with {text_file_path}\n\n")
-        if not isinstance(index_title, str) or not isinstance(text_file_path, str):
-            logger.warning(f"\nSkipping row {i} due to missing data.\n")
-            continue
-        upload_texts(site, index_title, text_file_path)
+    with open(csv_file_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for i, row in enumerate(reader):
+            index_title = row.get("Index")
+            text = row.get("text")
+            if not index_title or not text:
+                logger.warning(f"\nSkipping row {i} due to missing data.\n")
+                continue
+            text_file_path = os.path.join(data_dir, text)
+            logger.info(f"\n\nProcessing: {index_title} with {text_file_path}\n\n")
+            upload_texts(site, index_title, text_file_path)
 
 
 if __name__ == "__main__":
@@ -2,8 +2,10 @@ import csv
 import io
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import requests
 from google.oauth2 import service_account
@@ -15,6 +17,21 @@ logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# Downloads are network-bound; fetch several files at once
+DOWNLOAD_MAX_WORKERS = 16
+
+# Large chunks mean fewer HTTP range requests per Drive file
+DOWNLOAD_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Shared session so Docs exports reuse pooled keep-alive connections
+# instead of paying a TCP+TLS handshake per document
+_SESSION = requests.Session()
+
+# Precompiled URL patterns, reused across every row of the sheet
+_DRIVE_ID_RE = re.compile(r"/file/d/([a-zA-Z0-9_-]+)")
+_WS_IDX_RE = re.compile(r"/wiki/([^?#]+)")
+_GDOC_RE = re.compile(r"https://docs\.google\.com/document/d/([a-zA-Z0-9_-]+)")
+
 
 def get_drive_file_id(url: str) -> Optional[str]:
     """
@@ -26,7 +43,7 @@ def get_drive_file_id(url: str) -> Optional[str]:
     Returns:
         str: Extracted file ID or None if not found
     """
-    m = re.search(r"/file/d/([a-zA-Z0-9_-]+)", url)
+    m = _DRIVE_ID_RE.search(url)
     if m:
         return m.group(1)
     return None
@@ -42,7 +59,7 @@ def get_wikisource_index_from_url(url: str) -> Optional[str]:
     Returns:
         str: Extracted index title or None if not found
     """
-    m = re.search(r"/wiki/([^?#]+)", url)
+    m = _WS_IDX_RE.search(url)
     if m:
         return m.group(1)
     return None
@@ -82,11 +99,13 @@ def download_drive_file_with_name(
 
     # Download the file from Drive using the API (works for most non-Google Docs files)
     request = drive_service.files().get_media(fileId=file_id)
-    fh = io.FileIO(dest_path, "wb")
-    downloader = MediaIoBaseDownload(fh, request)
-    done = False
-    while not done:
-        status, done = downloader.next_chunk()
+    with io.FileIO(dest_path, "wb") as raw:
+        fh = io.BufferedWriter(raw, buffer_size=1 << 20)
+        downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+        fh.flush()
     return file_name
 
 
@@ -105,22 +124,21 @@ def download_google_doc_with_name(
         str: Name of the downloaded file
     """
     # Get file ID and real name
-    match = re.match(
-        r"https://docs.google.com/document/d/([a-zA-Z0-9_-]+)", doc_url
-    )  # noqa
+    match = _GDOC_RE.match(doc_url)
     if not match:
         raise ValueError("Not a Google Doc URL")
     file_id = match.group(1)
     file_name = get_drive_file_name(drive_service, file_id) + ".txt"  # exported as txt
     dest_path = Path(download_dir) / file_name
 
-    # Download as plain text
+    # Download as plain text, streaming chunks straight to disk
     export_url = (
         f"https://docs.google.com/document/d/{file_id}/export?format=txt"  # noqa
     )
-    response = requests.get(export_url)
-    with open(dest_path, "wb") as f:
-        f.write(response.content)
+    with _SESSION.get(export_url, stream=True) as response:
+        with open(dest_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1 << 16):
+                f.write(chunk)
     return file_name
 
 
@@ -147,52 +165,76 @@ def download_links_and_make_csv(
         ],
     )
     sheet_service = build("sheets", "v4", credentials=creds)
-    drive_service = build("drive", "v3", credentials=creds)
     sheet = sheet_service.spreadsheets()
 
+    # httplib2 transports are not thread-safe, so each download worker
+    # builds its own Drive client on first use and reuses it afterwards
+    thread_services = threading.local()
+
+    def _drive_service():
+        service = getattr(thread_services, "drive", None)
+        if service is None:
+            service = build("drive", "v3", credentials=creds)
+            thread_services.drive = service
+        return service
+
     result = sheet.get(
         spreadsheetId=sheet_id, ranges=[range_rows], includeGridData=True
     ).execute()
     rows = result["sheets"][0]["data"][0]["rowData"]
 
-    output_rows = []
     Path(download_dir).mkdir(parents=True, exist_ok=True)
 
-    for row in rows:
+    # Flatten the nested Sheets response in one pass, then validate each
+    # (wikidata_link, ws_link) pair and download concurrently — each fetch
+    # blocks on the network, so threads overlap the latency.
+    extracted = [
+        (v[0].get("hyperlink"), v[4].get("hyperlink"))
+        for r in rows
+        if (v := r.get("values")) and len(v) > 4
+    ]
+
+    download_tasks = []
+    for wikidata_link, ws_link in extracted:
+        if not wikidata_link or not ws_link:
+            logger.warning(
+                f"Missing Wikidata or Wikisource link in row: {(wikidata_link, ws_link)}"
+            )
+            continue
+        index_title = get_wikisource_index_from_url(ws_link)
+        if not index_title:
+            logger.warning(f"Invalid Wikisource link: {ws_link}")
+            continue
+        download_tasks.append((index_title, wikidata_link))
+
+    def _fetch_one(task) -> Optional[List[str]]:
+        index_title, wikidata_link = task
+        drive_service = _drive_service()
         try:
-            wikidata_cell = row["values"][0]
-            ws_link_cell = row["values"][4]
-            wikidata_link = wikidata_cell.get("hyperlink")
-            ws_link = ws_link_cell.get("hyperlink")
-
-            if not wikidata_link or not ws_link:
-                logger.warning(f"Missing Wikidata or Wikisource link in row: {row}")
-                continue
-            index_title = get_wikisource_index_from_url(ws_link)
-            if not index_title:
-                logger.warning(f"Invalid Wikisource link in row: {row}")
-                continue
-
             if "drive.google.com" in wikidata_link:
                 file_id = get_drive_file_id(wikidata_link)
-                if file_id:
-                    file_name = download_drive_file_with_name(
-                        drive_service, file_id, download_dir
-                    )
-                else:
+                if not file_id:
                     logger.warning(f"Could not extract file_id from: {wikidata_link}")
-                    continue
+                    return None
+                file_name = download_drive_file_with_name(
+                    drive_service, file_id, download_dir
+                )
             elif "docs.google.com/document" in wikidata_link:
                 file_name = download_google_doc_with_name(
                     drive_service, wikidata_link, download_dir
                 )
             else:
                 logger.warning(f"Unknown file type: {wikidata_link}")
-                continue
-
-            output_rows.append([index_title, file_name])
+                return None
+            return [index_title, file_name]
         except Exception as e:
-            logger.warning(f"Error processing row: {e}")
+            logger.warning(f"Error downloading {wikidata_link}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_MAX_WORKERS) as executor:
+        output_rows = [
+            row for row in executor.map(_fetch_one, download_tasks) if row is not None
+        ]
 
     # Write output CSV
     with open(output_csv, "w", newline="", encoding="utf-8") as f:
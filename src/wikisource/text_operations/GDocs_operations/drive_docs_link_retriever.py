@@ -3,6 +3,11 @@ import logging
 import os
 from typing import Dict, Optional
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None  # type: ignore[assignment]
+
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -120,7 +125,7 @@ class DriveDocumentLinker:
             query = f"parents in '{self.tengyur_folder_id}' and mimeType='application/vnd.google-apps.document' and trashed=false"
 
             self.logger.info(
-                f"🔍 Executing Drive API query:\n   Query: {query}\n   Fields: files(id,name,webViewLink)"
+                f"🔍 Executing Drive API query:\n   Query: {query}\n   Fields: files(id,name)"
             )
 
             # Handle pagination to get ALL documents
@@ -133,7 +138,9 @@ class DriveDocumentLinker:
                     self.drive_service.files()
                     .list(
                         q=query,
-                        fields="nextPageToken, files(id,name,webViewLink)",
+                        # Edit links are built from the id, so don't ask
+                        # Drive to compute webViewLink for every file
+                        fields="nextPageToken, files(id,name)",
                         supportsAllDrives=True,
                         pageSize=1000,
                         pageToken=page_token,
@@ -158,13 +165,15 @@ class DriveDocumentLinker:
                     break
 
                 self.logger.info(
-                    f"📄 Retrieved {total_files} documents so far, fetching next page..."
+                    "📄 Retrieved %d documents so far, fetching next page...",
+                    total_files,
                 )
 
-            self.logger.info(f"📊 Total documents retrieved: {total_files}")
+            self.logger.info("📊 Total documents retrieved: %d", total_files)
 
             self.logger.info(
-                f"✅ Successfully retrieved {len(filename_to_link)} document links from Google Drive"
+                "✅ Successfully retrieved %d document links from Google Drive",
+                len(filename_to_link),
             )
 
             # If no Google Docs found, check if folder has ANY files for debugging
@@ -239,8 +248,14 @@ class DriveDocumentLinker:
             os.makedirs(output_dir, exist_ok=True)
             output_file = os.path.join(output_dir, output_file)
 
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(filename_to_link, f, indent=2, ensure_ascii=False)
+            if orjson is not None:
+                # orjson serializes straight to UTF-8 bytes, several times
+                # faster than stdlib json on large Tibetan-keyed mappings
+                with open(output_file, "wb") as f:
+                    f.write(orjson.dumps(filename_to_link, option=orjson.OPT_INDENT_2))
+            else:
+                with open(output_file, "w", encoding="utf-8") as f:
+                    json.dump(filename_to_link, f, indent=2, ensure_ascii=False)
             self.logger.info(
                 f"💾 Successfully saved {len(filename_to_link)} document links\n   Output file: {output_file}"
             )
@@ -1,15 +1,25 @@
+import atexit
 import json
 import logging
 import os
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+# Google client imports live inside the methods that need them:
+# googleapiclient.discovery alone drags in httplib2 and the discovery
+# machinery, which callers that never touch the uploader (e.g. the
+# kagyur splitter pipeline) shouldn't pay for at import time.
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None  # type: ignore[assignment]
 
 SCOPES = [
     "https://www.googleapis.com/auth/drive",
@@ -17,9 +27,51 @@ SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
 ]
 
+# Uploads are network-bound (two HTTPS calls per doc); a modest pool
+# overlaps the per-file round-trip latency
+UPLOAD_MAX_WORKERS = 8
+
+# Appended progress events folded back into the snapshot this often
+PROGRESS_COMPACT_EVERY = 500
+
+# Root holding one subdirectory of .txt files per text_id
+TEXT_ROOT = Path("../../../../data_text_operations/text")
+
+# U+0F04, the Tibetan head mark trimmed from file tails; compared as an
+# int so the hot path never builds rstrip's per-call codepoint set
+TIB_MARK = ord("༄")
+_TRIM_CODEPOINTS = frozenset({TIB_MARK, 0x20, 0x0A, 0x09, 0x0D})
+
+
+class _RateLimiter:
+    """Spaces acquisitions a minimum interval apart across threads."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def acquire(self) -> None:
+        """Block until the caller may start its request."""
+        if self.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
 
 class GoogleDocsUploader:
-    """Handles uploading text files to Google Docs with resume capability"""
+    """
+    Handles uploading text files to Google Docs with resume capability
+
+    Every Drive/Docs call here passes the narrowest possible ``fields=``
+    mask (e.g. ``fields="id"`` on create); new calls must do the same —
+    the default response is a full resource, which costs server time and
+    client-side JSON parsing for bytes we never read.
+    """
 
     def __init__(
         self,
@@ -51,10 +103,23 @@ class GoogleDocsUploader:
         self.setup_logging()
         self.setup_google_services()
         self.tengyur_folder_id: Optional[str] = None
-        self.progress_data = self.load_progress()
 
-        # Dictionary to store text_id -> document_id mapping during execution
+        # Completions append one line here; the snapshot file is only
+        # rewritten on compaction, keeping per-file progress writes O(1)
+        self.progress_log = os.path.splitext(self.progress_file)[0] + ".jsonl"
+        self._events_since_compaction = 0
+
+        # Reentrant so save_progress can be called while the lock is held
+        self._progress_lock = threading.RLock()
+
+        # Dictionary to store text_id -> document_id mapping during
+        # execution; load_progress also refills it from logged events
         self.doc_id_mapping: Dict[str, str] = {}
+        self.progress_data = self.load_progress()
+
+        # text_id -> .txt path, built once per batch so read_text_file
+        # doesn't re-scan a directory per file
+        self._txt_index: Optional[Dict[str, Path]] = None
 
     def setup_logging(self) -> None:
         """Setup logging configuration with clean formatting"""
@@ -67,23 +132,26 @@ class GoogleDocsUploader:
         file_handler = logging.FileHandler(log_file_path)
         file_handler.setFormatter(formatter)
 
-        # Console handler with clean format
-        console_formatter = logging.Formatter(
-            "🔍 %(asctime)s | %(levelname)s\n📝 %(message)s"
-        )
+        # Console handler, same terse single-line format as the file —
+        # the two-line emoji format cost a second render per record
         console_handler = logging.StreamHandler()
-        console_handler.setFormatter(console_formatter)
+        console_handler.setFormatter(formatter)
+
+        # Hand records to a queue and format/write them on a background
+        # thread, so worker threads never serialize on stderr or disk
+        log_queue: queue.Queue = queue.Queue(-1)
+        queue_handler = QueueHandler(log_queue)
+        self._log_listener = QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        self._log_listener.start()
+        atexit.register(self._log_listener.stop)
 
         # Configure logger
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
-
-        # Clear any existing handlers
         self.logger.handlers.clear()
-
-        # Add our custom handlers
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        self.logger.addHandler(queue_handler)
 
         # Prevent propagation to root logger
         self.logger.propagate = False
@@ -92,6 +160,11 @@ class GoogleDocsUploader:
 
     def setup_google_services(self) -> None:
         """Initialize Google API services via OAuth user credentials."""
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
+
         creds = None
         # Reuse token if present
         if os.path.exists(self.token_path):
@@ -113,6 +186,8 @@ class GoogleDocsUploader:
                 token.write(creds.to_json())
 
         # cache_discovery=False silences the oauth2client file_cache notice
+        self._creds = creds
+        self._thread_services = threading.local()
         self.docs_service = build(
             "docs", "v1", credentials=creds, cache_discovery=False
         )
@@ -121,30 +196,142 @@ class GoogleDocsUploader:
         )
         self.logger.info("🚀 Google API services (OAuth) initialized successfully")
 
-    def load_progress(self) -> Dict:
-        """Load progress from file"""
-        if os.path.exists(self.progress_file):
+        # Refresh the token in the background shortly before expiry so no
+        # in-flight upload pays the blocking refresh round-trip
+        self._creds_lock = threading.Lock()
+        threading.Thread(target=self._refresh_credentials_loop, daemon=True).start()
+
+    def _refresh_credentials_loop(self) -> None:
+        """Refresh OAuth credentials ~5 minutes before they expire."""
+        from google.auth.transport.requests import Request
+
+        while True:
+            expiry = self._creds.expiry
+            if expiry is None:
+                time.sleep(300)
+                continue
+            # google-auth expiries are naive UTC datetimes
+            wait = (expiry - datetime.utcnow()).total_seconds() - 300
+            time.sleep(max(30, wait))
             try:
-                with open(self.progress_file) as f:
-                    return json.load(f)
+                with self._creds_lock:
+                    self._creds.refresh(Request())
+                    with open(self.token_path, "w") as token:
+                        token.write(self._creds.to_json())
+                self.logger.info("🔄 Refreshed OAuth token in background")
             except Exception as e:
-                self.logger.warning(f"Could not load progress file: {e}")
+                self.logger.warning(f"Background token refresh failed: {e}")
+                time.sleep(60)
+
+    def _get_thread_services(self):
+        """
+        Return (docs, drive) clients owned by the calling thread.
+
+        httplib2 transports are not thread-safe, so each worker builds
+        its own clients on first use and reuses them afterwards.
+        """
+        from googleapiclient.discovery import build
 
-        return {
+        services = getattr(self._thread_services, "services", None)
+        if services is None:
+            services = (
+                build("docs", "v1", credentials=self._creds, cache_discovery=False),
+                build("drive", "v3", credentials=self._creds, cache_discovery=False),
+            )
+            self._thread_services.services = services
+        return services
+
+    def load_progress(self) -> Dict:
+        """Load progress from the snapshot plus any appended JSONL events"""
+        progress: Dict = {
             "completed": [],
             "failed": [],
             "last_processed": None,
             "tengyur_folder_id": None,
         }
+        # orjson parses straight from bytes several times faster than
+        # stdlib json; both accept the same inputs here
+        loads = orjson.loads if orjson is not None else json.loads
+
+        if os.path.exists(self.progress_file):
+            try:
+                with open(self.progress_file, "rb") as f:
+                    progress.update(loads(f.read()))
+            except Exception as e:
+                self.logger.warning(f"Could not load progress file: {e}")
+
+        # Fold in events appended since the last compaction (crash-safe:
+        # a partial final line is simply skipped)
+        if os.path.exists(self.progress_log):
+            try:
+                with open(self.progress_log, encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            event = loads(line)
+                        except ValueError:
+                            continue
+                        if event.get("status") == "ok":
+                            progress["completed"].append(event["id"])
+                            progress["last_processed"] = event["id"]
+                            if event.get("doc_id"):
+                                self.doc_id_mapping[event["id"]] = event["doc_id"]
+                        else:
+                            progress["failed"].append(event["id"])
+            except Exception as e:
+                self.logger.warning(f"Could not load progress log: {e}")
+
+        # Set mirrors of the lists give O(1) membership tests on the hot
+        # path; the lists are kept for the serialized snapshot
+        self._completed_set = set(progress["completed"])
+        self._failed_set = set(progress["failed"])
+        return progress
 
     def save_progress(self) -> None:
-        """Save current progress to file"""
+        """Atomically rewrite the progress snapshot"""
         try:
-            with open(self.progress_file, "w") as f:
-                json.dump(self.progress_data, f, indent=2)
+            with self._progress_lock:
+                tmp_path = self.progress_file + ".tmp"
+                if orjson is not None:
+                    payload = orjson.dumps(self.progress_data)
+                else:
+                    payload = json.dumps(
+                        self.progress_data, separators=(",", ":")
+                    ).encode("utf-8")
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, self.progress_file)
         except Exception as e:
             self.logger.error(f"Failed to save progress: {e}")
 
+    def _append_progress(self, event: Dict) -> None:
+        """Append one progress event to the JSONL log"""
+        try:
+            with self._progress_lock:
+                if orjson is not None:
+                    line = orjson.dumps(event) + b"\n"
+                else:
+                    line = (json.dumps(event, separators=(",", ":")) + "\n").encode(
+                        "utf-8"
+                    )
+                with open(self.progress_log, "ab") as f:
+                    f.write(line)
+                self._events_since_compaction += 1
+                if self._events_since_compaction >= PROGRESS_COMPACT_EVERY:
+                    self.compact_progress()
+        except Exception as e:
+            self.logger.error(f"Failed to append progress: {e}")
+
+    def compact_progress(self) -> None:
+        """Fold appended events into the snapshot and truncate the log"""
+        with self._progress_lock:
+            self.save_progress()
+            if os.path.exists(self.progress_log):
+                os.remove(self.progress_log)
+            self._events_since_compaction = 0
+
     def _write_mapping_to_json(self) -> None:
         """Write the URL mapping to JSON file at the end of execution, merging with existing mappings"""
         if not self.doc_id_mapping:
@@ -164,8 +351,11 @@ class GoogleDocsUploader:
 
         if os.path.exists(url_mapping_file):
             try:
-                with open(url_mapping_file) as f:
-                    existing_mapping = json.load(f)
+                with open(url_mapping_file, "rb") as f:
+                    raw = f.read()
+                existing_mapping = (
+                    orjson.loads(raw) if orjson is not None else json.loads(raw)
+                )
                 self.logger.info(
                     f"📖 Loaded {len(existing_mapping)} existing mappings from {url_mapping_file}"
                 )
@@ -178,8 +368,12 @@ class GoogleDocsUploader:
 
         # Save combined URL mapping
         try:
-            with open(url_mapping_file, "w") as f:
-                json.dump(combined_mapping, f, indent=2)
+            if orjson is not None:
+                with open(url_mapping_file, "wb") as f:
+                    f.write(orjson.dumps(combined_mapping, option=orjson.OPT_INDENT_2))
+            else:
+                with open(url_mapping_file, "w") as f:
+                    json.dump(combined_mapping, f, indent=2)
             self.logger.info(f"🔗 URL mapping saved to {url_mapping_file}")
             self.logger.info(
                 f"   📊 Total entries: {len(combined_mapping)} (added {len(new_url_mapping)} new)"
@@ -189,6 +383,8 @@ class GoogleDocsUploader:
 
     def get_tengyur_folder(self) -> str:
         """Use the existing Tengyur folder in Google Drive (works for My Drive or Shared Drives)."""
+        from googleapiclient.errors import HttpError
+
         self.tengyur_folder_id = "1Ae6rQadtfxfwKICLC87szcJAUjqQI7PR"  # your folder ID
         try:
             folder_info = (
@@ -216,30 +412,65 @@ class GoogleDocsUploader:
 
     def clean_text_content(self, content: str) -> str:
         """Remove trailing ༄ character from text content if present at the end"""
-        if content.endswith("༄"):
-            cleaned_content = content.rstrip("༄").rstrip()
+        if content and ord(content[-1]) == TIB_MARK:
+            # One tail-walk strips the mark and any surrounding
+            # whitespace against a prebuilt codepoint set
+            tail = len(content) - 1
+            while tail and ord(content[tail - 1]) in _TRIM_CODEPOINTS:
+                tail -= 1
             self.logger.info("🧹 Removed trailing ༄ character from text content")
-            return cleaned_content
+            return content[:tail]
         return content
 
+    def _build_text_index(self) -> Dict[str, Path]:
+        """
+        Map every text_id to its .txt file in one walk of TEXT_ROOT.
+
+        One os.scandir pass over the root plus one per subdirectory,
+        instead of an exists() + glob() per read_text_file call.
+        """
+        index: Dict[str, Path] = {}
+        if not TEXT_ROOT.is_dir():
+            return index
+        with os.scandir(TEXT_ROOT) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                try:
+                    with os.scandir(entry.path) as files:
+                        for item in files:
+                            if item.name.endswith(".txt") and item.is_file():
+                                index[entry.name] = Path(item.path)
+                                break
+                except OSError:
+                    continue
+        return index
+
     def read_text_file(self, text_id: str) -> Optional[str]:
         """Read content from text file"""
-        text_file_path = Path(f"../../../../data_text_operations/text/{text_id}")
+        txt_file = None
+        if self._txt_index is not None:
+            txt_file = self._txt_index.get(text_id)
 
-        # Look for text files in the directory
-        if not text_file_path.exists():
-            self.logger.warning(f"Directory not found: {text_file_path}")
-            return None
+        if txt_file is None:
+            # Index miss (or no index built): fall back to scanning the
+            # text_id directory directly
+            text_file_path = TEXT_ROOT / text_id
 
-        # Find .txt files in the directory
-        txt_files = list(text_file_path.glob("*.txt"))
+            # Look for text files in the directory
+            if not text_file_path.exists():
+                self.logger.warning(f"Directory not found: {text_file_path}")
+                return None
 
-        if not txt_files:
-            self.logger.warning(f"No .txt files found in {text_file_path}")
-            return None
+            # Find .txt files in the directory
+            txt_files = list(text_file_path.glob("*.txt"))
 
-        # Use the first .txt file found
-        txt_file = txt_files[0]
+            if not txt_files:
+                self.logger.warning(f"No .txt files found in {text_file_path}")
+                return None
+
+            # Use the first .txt file found
+            txt_file = txt_files[0]
 
         try:
             with open(txt_file, encoding="utf-8") as f:
@@ -257,26 +488,35 @@ class GoogleDocsUploader:
 
     def create_google_doc(self, text_id: str, content: str) -> Optional[str]:
         """Create a Google Doc with the given content directly inside the Tengyur folder."""
+        from googleapiclient.errors import HttpError
+        from googleapiclient.http import MediaInMemoryUpload
+
         try:
-            # Create the Doc IN the target folder
+            _, drive_service = self._get_thread_services()
+
+            # Upload the text as the media body and let Drive convert it
+            # to a Google Doc: one round-trip instead of create followed
+            # by a documents().batchUpdate insert
             file_metadata = {
                 "name": text_id,
                 "mimeType": "application/vnd.google-apps.document",
                 "parents": [self.tengyur_folder_id],
             }
+            media = MediaInMemoryUpload(
+                content.encode("utf-8"), mimetype="text/plain", resumable=False
+            )
             doc = (
-                self.drive_service.files()
-                .create(body=file_metadata, fields="id", supportsAllDrives=True)
+                drive_service.files()
+                .create(
+                    body=file_metadata,
+                    media_body=media,
+                    fields="id",
+                    supportsAllDrives=True,
+                )
                 .execute()
             )
             doc_id = doc.get("id")
 
-            # Insert content
-            requests = [{"insertText": {"location": {"index": 1}, "text": content}}]
-            self.docs_service.documents().batchUpdate(
-                documentId=doc_id, body={"requests": requests}
-            ).execute()
-
             self.logger.info(
                 f"🎉 Successfully created Google Doc\n   Text ID: {text_id}\n   Doc ID: {doc_id}"
             )
@@ -289,9 +529,10 @@ class GoogleDocsUploader:
     def process_text_file(self, text_id: str) -> bool:
         """Process a single text file"""
         # Skip if already completed
-        if text_id in self.progress_data["completed"]:
-            self.logger.info(f"Skipping {text_id} - already completed")
-            return True
+        with self._progress_lock:
+            if text_id in self._completed_set:
+                self.logger.info(f"Skipping {text_id} - already completed")
+                return True
 
         # Start processing log
         self.logger.info(f"📄 Processing {text_id}...")
@@ -299,31 +540,33 @@ class GoogleDocsUploader:
         # Read text content
         content = self.read_text_file(text_id)
         if not content:
-            self.progress_data["failed"].append(text_id)
-            self.save_progress()
+            with self._progress_lock:
+                self.progress_data["failed"].append(text_id)
+                self._failed_set.add(text_id)
+                self._append_progress({"status": "failed", "id": text_id})
             return False
 
         # Create Google Doc
         doc_id = self.create_google_doc(text_id, content)
         if not doc_id:
-            self.progress_data["failed"].append(text_id)
-            self.save_progress()
+            with self._progress_lock:
+                self.progress_data["failed"].append(text_id)
+                self._failed_set.add(text_id)
+                self._append_progress({"status": "failed", "id": text_id})
             self.logger.error(f"❌ Failed to create Google Doc for {text_id}")
-            # Add separator line after failed processing
-            print("\n" + "-" * 80 + "\n")
             return False
 
-        # Store document ID in mapping dictionary
-        self.doc_id_mapping[text_id] = doc_id
-
-        # Mark as completed
-        self.progress_data["completed"].append(text_id)
-        self.progress_data["last_processed"] = text_id
-        self.save_progress()
+        # Store document ID and mark as completed
+        with self._progress_lock:
+            self.doc_id_mapping[text_id] = doc_id
+            self.progress_data["completed"].append(text_id)
+            self._completed_set.add(text_id)
+            self.progress_data["last_processed"] = text_id
+            self._append_progress(
+                {"status": "ok", "id": text_id, "doc_id": doc_id}
+            )
 
         self.logger.info(f"✅ Successfully completed {text_id}")
-        # Add separator line after completing each text file
-        print("\n" + "-" * 80 + "\n")
         return True
 
     def get_text_ids_in_range(
@@ -370,6 +613,10 @@ class GoogleDocsUploader:
         # Setup Tengyur folder
         self.get_tengyur_folder()
 
+        # One directory walk up front replaces a per-file glob in every
+        # read_text_file call
+        self._txt_index = self._build_text_index()
+
         # Get text IDs to process
         text_ids = self.get_text_ids_in_range(start_id, end_id)
 
@@ -378,47 +625,67 @@ class GoogleDocsUploader:
             return
 
         total_files = len(text_ids)
-        completed_count = len(
-            [tid for tid in text_ids if tid in self.progress_data["completed"]]
-        )
+        completed_count = len(set(text_ids) & self._completed_set)
 
         self.logger.info(
             f"📊 Upload Statistics\n   Total files to process: {total_files}\n   Already completed: {completed_count}\n   Remaining: {total_files - completed_count}"
         )
 
-        # Process each text file
-        for i, text_id in enumerate(text_ids, 1):
-            try:
-                success = self.process_text_file(text_id)
+        # Process text files concurrently; the shared limiter keeps doc
+        # creations at most one per `delay` seconds across all workers
+        limiter = _RateLimiter(delay)
 
-                if success:
-                    self.logger.info(
-                        f"🚀 Overall Progress: {i}/{total_files} files completed"
-                    )
-                else:
-                    self.logger.error(
-                        f"⚠️  Overall Progress: {i}/{total_files} files processed (last failed)"
-                    )
-
-                # Rate limiting delay
-                if delay > 0:
-                    time.sleep(delay)
+        def _process_one(text_id: str) -> bool:
+            limiter.acquire()
+            return self.process_text_file(text_id)
 
+        with ThreadPoolExecutor(max_workers=UPLOAD_MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(_process_one, text_id): text_id
+                for text_id in text_ids
+            }
+            try:
+                for i, future in enumerate(as_completed(futures), 1):
+                    text_id = futures[future]
+                    try:
+                        success = future.result()
+                    except Exception as e:
+                        self.logger.error(
+                            f"Unexpected error processing {text_id}: {e}"
+                        )
+                        with self._progress_lock:
+                            self.progress_data["failed"].append(text_id)
+                            self._failed_set.add(text_id)
+                            self._append_progress(
+                                {"status": "failed", "id": text_id}
+                            )
+                        continue
+
+                    if success:
+                        self.logger.info(
+                            f"🚀 Overall Progress: {i}/{total_files} files completed"
+                        )
+                    else:
+                        self.logger.error(
+                            f"⚠️  Overall Progress: {i}/{total_files} files processed (last failed)"
+                        )
             except KeyboardInterrupt:
                 self.logger.info("Upload interrupted by user")
-                break
-            except Exception as e:
-                self.logger.error(f"Unexpected error processing {text_id}: {e}")
-                self.progress_data["failed"].append(text_id)
-                self.save_progress()
-
-        # Final summary
-        final_completed = len(
-            [tid for tid in text_ids if tid in self.progress_data["completed"]]
-        )
-        final_failed = len(
-            [tid for tid in text_ids if tid in self.progress_data["failed"]]
-        )
+                # Cancel everything still queued, or the with-block's
+                # shutdown(wait=True) would drain the whole backlog at
+                # one doc per `delay` seconds before returning
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=False)
+
+        # Fold this run's events into the snapshot
+        self.compact_progress()
+
+        # Final summary — set intersections keep this O(N) rather than a
+        # list-membership scan per id
+        text_ids_set = set(text_ids)
+        final_completed = len(text_ids_set & self._completed_set)
+        final_failed = len(text_ids_set & self._failed_set)
 
         self.logger.info("✅ Upload batch completed!")
         self.logger.info(
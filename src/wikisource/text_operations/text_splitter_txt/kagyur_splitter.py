@@ -1,4 +1,7 @@
+import mmap
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Optional, Tuple
 
@@ -13,6 +16,35 @@ BRACKET_PAGE_RE = re.compile(r"\[\d+[a-z]\]")
 # Text variants like {བཅྭ་,བཅོ་} - take the right side (after comma)
 TEXT_VARIANT_RE = re.compile(r"\{([^,}]+),([^}]+)\}")
 
+# All per-line cleanups as one alternation so each line is scanned by the
+# regex engine once instead of once per pattern. Alternative order matters:
+# the variant branch requires a comma, so {D…} tokens fall through to the
+# dash/section branches.
+COMBINED_LINE_RE = re.compile(
+    r"\{[^,}]+,(?P<variant>[^}]+)\}"  # text variants -> right side
+    r"|\[\d+[a-z]\.\d+\]"  # dotted page markers -> removed
+    r"|\{D\d+-\d+\}"  # section dash tokens -> removed
+    r"|\{D(?P<num>\d+)(?P<letter>[a-z])?\}"  # section starters -> removed
+)
+
+# Buffer-level subset of COMBINED_LINE_RE: everything except section
+# starters, which process_file must still see line by line. Newlines are
+# excluded from the variant branch so an unbalanced brace can't swallow
+# text across lines. Compiled over bytes so it can run straight on the
+# mmap'd file before any UTF-8 decode; the delimiter bytes ({}[],
+# newline) are ASCII and never occur inside multi-byte sequences, so
+# byte-wise matching is equivalent to the str pattern.
+PRECLEAN_RE = re.compile(
+    rb"\{[^,}\n]+,(?P<variant>[^}\n]+)\}"
+    rb"|\[\d+[a-z]\.\d+\]"
+    rb"|\{D\d+-\d+\}"
+)
+
+
+def _preclean_repl(match) -> bytes:
+    variant = match.group("variant")
+    return variant if variant is not None else b""
+
 
 class LineByLineProcessor:
     def __init__(self, input_dir: Path, output_dir: Path, content_threshold: int = 50):
@@ -30,24 +62,22 @@ class LineByLineProcessor:
         - section_token: if a section token is found (e.g., "D1", "D1a")
         - has_page_marker: if line contains a page marker
         """
-        # Handle text variants like {བཅྭ་,བཅོ་} - take the right side (after comma)
-        line = TEXT_VARIANT_RE.sub(r"\2", line)
-
-        # Remove dotted page markers entirely
-        line = BRACKET_WITH_DOT_RE.sub("", line)
-
-        # Remove section dash tokens
-        line = SECTION_DASH_TOKEN_RE.sub("", line)
-
-        # Check for section tokens
-        section_match = SECTION_TOKEN_RE.search(line)
         section_token = None
-        if section_match:
-            sect_num = section_match.group(1)
-            sect_letter = section_match.group(2) or ""
-            section_token = f"D{sect_num}{sect_letter}"
-            # Remove the section token from the line
-            line = SECTION_TOKEN_RE.sub("", line)
+
+        def dispatch(match):
+            # One callback handles every alternative: variants keep the
+            # right side, section starters record the first token seen,
+            # everything else is stripped
+            nonlocal section_token
+            variant = match.group("variant")
+            if variant is not None:
+                return variant
+            num = match.group("num")
+            if num is not None and section_token is None:
+                section_token = f"D{num}{match.group('letter') or ''}"
+            return ""
+
+        line = COMBINED_LINE_RE.sub(dispatch, line)
 
         # Check if line has page markers
         has_page_marker = bool(BRACKET_PAGE_RE.search(line))
@@ -65,57 +95,40 @@ class LineByLineProcessor:
         # Line is meaningful if it has non-whitespace content after cleaning
         return len(cleaned) > 0
 
-    def count_meaningful_lines_before_section(
-        self, lines: List[str]
-    ) -> Tuple[int, int]:
-        """
-        Count meaningful lines before the first section token.
-        Returns (meaningful_count, first_section_line_index)
-        """
-        meaningful_count = 0
-        first_section_line = -1
-
-        for i, line in enumerate(lines):
-            # Check if this line has a section token
-            if SECTION_TOKEN_RE.search(line):
-                first_section_line = i
-                break
-
-            # Count meaningful lines
-            if self.is_meaningful_line(line):
-                meaningful_count += 1
-
-        return meaningful_count, first_section_line
-
     def replace_page_markers(self, line: str, page_counter: int) -> Tuple[str, int]:
         """
         Replace page markers with Page: N and return updated line and new counter
         """
 
-        def repl(match):
-            nonlocal page_counter
-            result = f"Page: {page_counter}"
+        # finditer + slice assembly avoids one Python callback per match
+        parts: List[str] = []
+        last = 0
+        for match in BRACKET_PAGE_RE.finditer(line):
+            start, end = match.span()
+            parts.append(line[last:start])
+            parts.append(f"Page: {page_counter}")
             page_counter += 1
-            return result
-
-        processed_line = BRACKET_PAGE_RE.sub(repl, line)
-        return processed_line, page_counter
+            last = end
+        if not parts:
+            return line, page_counter
+        parts.append(line[last:])
+        return "".join(parts), page_counter
 
     def process_file(self, input_file: Path) -> List[Path]:
         """
         Process a single input file line by line
         """
-        content = input_file.read_text(encoding="utf-8")
-        lines = content.splitlines()
-
-        # Check if we should split before the first section token
-        (
-            meaningful_count,
-            first_section_line,
-        ) = self.count_meaningful_lines_before_section(lines)
-        should_split_before_first = (
-            meaningful_count >= self.content_threshold and first_section_line > 0
-        )
+        # Bulk pass over the mmap'd bytes: variants, dotted markers and
+        # dash tokens come out of the whole buffer in one C-level scan
+        # before the file is ever decoded, so the per-line loop below
+        # only has section tokens and page markers left to handle
+        if input_file.stat().st_size == 0:
+            cleaned = b""
+        else:
+            with open(input_file, "rb") as fh:
+                with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    cleaned = PRECLEAN_RE.sub(_preclean_repl, mm)
+        lines = cleaned.decode("utf-8").splitlines()
 
         output_files: List[Path] = []
         current_lines: List[str] = []
@@ -124,21 +137,36 @@ class LineByLineProcessor:
         last_page_marker_line: Optional[str] = None
         section_counter = 0
 
-        for line in lines:
-            processed_line, section_token, has_page_marker = self.process_line(line)
+        # Counted on the fly instead of a separate pre-pass: the lines
+        # before the first section token are buffered anyway, so the
+        # split-before-first decision can be made when the token appears
+        meaningful_before_first = 0
+
+        for line_idx, line in enumerate(lines):
+            # Lean inline version of process_line: the buffer pre-clean
+            # already handled variants and removable markers
+            section_token = None
+            section_match = SECTION_TOKEN_RE.search(line)
+            if section_match:
+                sect_letter = section_match.group(2) or ""
+                section_token = f"D{section_match.group(1)}{sect_letter}"
+                processed_line = SECTION_TOKEN_RE.sub("", line)
+            else:
+                processed_line = line
+            has_page_marker = bool(BRACKET_PAGE_RE.search(processed_line))
 
             # If we find a section token
             if section_token:
                 if section_counter == 0:
+                    should_split_before_first = (
+                        meaningful_before_first >= self.content_threshold
+                        and line_idx > 0
+                    )
                     if should_split_before_first:
-                        # Split before first section token - create base file first
-                        # Remove the last page marker from current file if it exists
-                        if last_page_marker_line is not None and current_lines:
-                            # Find and remove the last page marker line
-                            for i in range(len(current_lines) - 1, -1, -1):
-                                if BRACKET_PAGE_RE.search(current_lines[i]):
-                                    last_page_marker_line = current_lines.pop(i)
-                                    break
+                        # Split before first section token. Buffered lines
+                        # have had their bracket markers rewritten to
+                        # "Page: N" already, so no O(M) scan for a marker
+                        # line is needed (it could never match).
 
                         # Write base file (content before first section)
                         output_file = self.write_section_file(
@@ -164,13 +192,9 @@ class LineByLineProcessor:
                         current_section = section_token
                         section_counter += 1
                 else:
-                    if last_page_marker_line is not None and current_lines:
-                        # Find and remove the last page marker line
-                        for i in range(len(current_lines) - 1, -1, -1):
-                            if BRACKET_PAGE_RE.search(current_lines[i]):
-                                last_page_marker_line = current_lines.pop(i)
-                                break
-
+                    # As above: buffered lines are already rewritten, so
+                    # the previous reverse scan for a marker line was a
+                    # guaranteed miss
                     output_file = self.write_section_file(
                         input_file, current_section, current_lines
                     )
@@ -191,6 +215,11 @@ class LineByLineProcessor:
 
                     section_counter += 1
 
+            # Still ahead of the first section token: keep the running
+            # meaningful-line count current for the split decision
+            if section_counter == 0 and self.is_meaningful_line(line):
+                meaningful_before_first += 1
+
             if has_page_marker:
                 processed_line, page_counter = self.replace_page_markers(
                     processed_line, page_counter
@@ -223,8 +252,13 @@ class LineByLineProcessor:
             output_name = f"{input_file.stem}_{section}.txt"
 
         output_path = self.output_dir / output_name
-        content = "\n".join(lines)
-        output_path.write_text(content, encoding="utf-8")
+        # Stream lines through a large buffer instead of materializing
+        # one joined string for the whole section
+        with open(output_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+            for i, line in enumerate(lines):
+                if i:
+                    f.write("\n")
+                f.write(line)
         return output_path
 
     def process_all_files(self) -> None:
@@ -240,16 +274,37 @@ class LineByLineProcessor:
         total_outputs = 0
         print(f"Found {len(txt_files)} input files.")
 
-        for txt_file in txt_files:
-            output_files = self.process_file(txt_file)
-            total_outputs += len(output_files)
-            print(f"- {txt_file.name} -> {len(output_files)} section file(s)")
+        # Each file is regex-bound and independent of the others, so the
+        # batch fans out across cores
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = {
+                executor.submit(
+                    _process_one, txt_file, self.output_dir, self.content_threshold
+                ): txt_file
+                for txt_file in txt_files
+            }
+            for future in as_completed(futures):
+                txt_file = futures[future]
+                count = future.result()
+                total_outputs += count
+                print(f"- {txt_file.name} -> {count} section file(s)")
 
         print(
             f"\nDone. Wrote {total_outputs} output file(s) to: {self.output_dir.resolve()}"
         )
 
 
+def _process_one(input_file: Path, output_dir: Path, content_threshold: int) -> int:
+    """
+    Process one input file in a worker process.
+
+    Module-level so it is picklable for ProcessPoolExecutor; returns the
+    number of section files written.
+    """
+    processor = LineByLineProcessor(input_file.parent, output_dir, content_threshold)
+    return len(processor.process_file(input_file))
+
+
 def main():
     script_dir = Path(__file__).parent.parent.parent
     input_dir = script_dir / "data_text_operations" / "kagyur_text"
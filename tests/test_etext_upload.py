@@ -1,9 +1,26 @@
 import os
 import tempfile
 import unittest
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
-from wikisource.etext_upload import get_page_titles, log_upload_result, parse_text_file
+from wikisource.etext_upload import (
+    flush_upload_log,
+    get_page_titles,
+    log_upload_result,
+    parse_text_file,
+)
+
+# Shared fixture content, built once for the whole module instead of
+# re-concatenated in every setUp
+_FIXTURE = (
+    "Page no: 1\n"
+    "This is page one text.\n"
+    "More text for page one.\n"
+    "Page no: 2\n"
+    "This is (some) text for page two.\n"
+    "More text (with parentheses) for page two."
+)
 
 
 class TestETextUpload(unittest.TestCase):
@@ -12,15 +29,7 @@ class TestETextUpload(unittest.TestCase):
         self.temp_dir = tempfile.TemporaryDirectory()
         self.test_file_path = os.path.join(self.temp_dir.name, "test_text.txt")
         print(f"test_file_path: {self.test_file_path}")
-        with open(self.test_file_path, "w", encoding="utf-8") as f:
-            f.write(
-                "Page no: 1\n"
-                "This is page one text.\n"
-                "More text for page one.\n"
-                "Page no: 2\n"
-                "This is (some) text for page two.\n"
-                "More text (with parentheses) for page two."
-            )
+        Path(self.test_file_path).write_text(_FIXTURE, encoding="utf-8")
 
     def tearDown(self):
         # Clean up temporary directory
@@ -38,16 +47,22 @@ class TestETextUpload(unittest.TestCase):
             result["2"], "This is  text for page two.\nMore text  for page two."
         )
 
-    @patch("wikisource.etext_upload.json.load")
+    def test_parse_text_file_crlf(self):
+        """Test that CRLF line endings are normalized like text-mode reads"""
+        crlf_path = os.path.join(self.temp_dir.name, "test_text_crlf.txt")
+        Path(crlf_path).write_bytes(_FIXTURE.replace("\n", "\r\n").encode("utf-8"))
+        self.assertEqual(parse_text_file(crlf_path), parse_text_file(self.test_file_path))
+
+    @patch("wikisource.etext_upload.pickle.load")
     @patch("wikisource.etext_upload.open")
     @patch("pathlib.Path.exists")
-    def test_get_page_titles_from_cache(self, mock_exists, mock_open, mock_json_load):
+    def test_get_page_titles_from_cache(self, mock_exists, mock_open, mock_pickle_load):
         """Test loading page titles from cache"""
         # Mock cache file exists
         mock_exists.return_value = True
 
-        # Mock the json data that would be loaded from cache
-        mock_json_load.return_value = {"1": "Page:Test/1", "2": "Page:Test/2"}
+        # Mock the mapping that would be loaded from cache
+        mock_pickle_load.return_value = {"1": "Page:Test/1", "2": "Page:Test/2"}
 
         # Mock the site object
         mock_site = MagicMock()
@@ -56,7 +71,10 @@ class TestETextUpload(unittest.TestCase):
         with patch("pywikibot.proofreadpage.ProofreadPage") as mock_proofreadpage:
             mock_page1 = MagicMock()
             mock_page2 = MagicMock()
-            mock_proofreadpage.side_effect = [mock_page1, mock_page2]
+            # Dict-backed side_effect: O(1) per lookup and independent of
+            # call order, unlike a consume-once list
+            pages = {"Page:Test/1": mock_page1, "Page:Test/2": mock_page2}
+            mock_proofreadpage.side_effect = lambda site, title: pages[title]
 
             # Call the function
             result = get_page_titles("Index:Test", mock_site)
@@ -81,10 +99,11 @@ class TestETextUpload(unittest.TestCase):
         mock_writer = MagicMock()
         mock_csv_writer.return_value = mock_writer
 
-        # Call the function
+        # Call the function; rows are buffered until the log is flushed
         log_upload_result(
             "Index:Test", "1", "Page:Test/1", "success", None, "test_log.csv"
         )
+        flush_upload_log()
 
         # Verify header was written
         mock_writer.writerow.assert_any_call(
@@ -98,15 +117,17 @@ class TestETextUpload(unittest.TestCase):
             ]
         )
 
-        # Verify data row was written
-        mock_writer.writerow.assert_any_call(
+        # Verify the buffered data row was written in one batch
+        mock_writer.writerows.assert_called_once_with(
             [
-                unittest.mock.ANY,  # timestamp will vary
-                "Index:Test",
-                "1",
-                "Page:Test/1",
-                "success",
-                "",
+                [
+                    unittest.mock.ANY,  # timestamp will vary
+                    "Index:Test",
+                    "1",
+                    "Page:Test/1",
+                    "success",
+                    "",
+                ]
             ]
         )
 